@@ -41,6 +41,8 @@ DYNAMIC_ATTRIBUTE_MARKERS = [
 DUMMY_CONTAINER = object()
 
 # Names defined on every module/class that should be ignored in most cases.
+# These are frozensets rather than tuples: string hashes are cached, so lookups
+# are cheap, and callers also use them in set operations.
 TOP_LEVEL_IGNORE = frozenset({
     "__builtins__",
     "__doc__",
@@ -66,6 +68,25 @@ class ConversionError(ValueError):
   pass
 
 
+class _AtomicValueError(ConversionError):
+  """The error for a variable that get_atomic_value cannot unwrap.
+
+  Callers often catch the error and discard it, so we record the variable's
+  data when the error is raised but only format the full message in __str__.
+  """
+
+  def __init__(self, variable, constant_type):
+    super().__init__("Cannot get atomic value from variable.")
+    self._variable = repr(variable)
+    self._data = [b.data for b in variable.bindings]
+    self._constant_type = constant_type
+
+  def __str__(self):
+    name = self._data[0].vm.convert.constant_name(self._constant_type)
+    return "Cannot get atomic value %s from variable. %s %s" % (
+        name, self._variable, self._data)
+
+
 class EvaluationError(Exception):
   """Used to signal an errorlog error during type name evaluation."""
 
@@ -120,11 +141,7 @@ def get_atomic_value(variable, constant_type=None, default=_None()):
   # Determine an appropriate failure message.
   if not variable.bindings:
     raise ConversionError("Cannot get atomic value from empty variable.")
-  bindings = variable.bindings
-  name = bindings[0].data.vm.convert.constant_name(constant_type)
-  raise ConversionError(
-      "Cannot get atomic value %s from variable. %s %s"
-      % (name, variable, [b.data for b in bindings]))
+  raise _AtomicValueError(variable, constant_type)
 
 
 def get_atomic_python_constant(variable, constant_type=None):
@@ -146,6 +163,37 @@ def get_atomic_python_constant(variable, constant_type=None):
   return atomic.vm.convert.value_to_constant(atomic, constant_type)
 
 
+class _AccessedSubsets:
+  """A trie of the accessed subsets of previously seen views.
+
+  Each subset is stored as a path of (variable, binding) edges, ordered by
+  variable id, so that subsets sharing a prefix also share the work of checking
+  them against a new view.
+  """
+
+  def __init__(self):
+    self._root = {}
+
+  def add(self, subset):
+    node = self._root
+    for item in sorted(subset.items(), key=lambda item: item[0].id):
+      node = node.setdefault(item, {})
+    node[None] = None  # marks the end of a subset
+
+  def has_subset_of(self, view):
+    """Whether any stored subset is contained in the given view."""
+    stack = [self._root]
+    while stack:
+      node = stack.pop()
+      for item, child in node.items():
+        if item is None:
+          return True
+        var, binding = item
+        if view.get(var) is binding:
+          stack.append(child)
+    return False
+
+
 def get_views(variables, node):
   """Get all possible views of the given variables at a particular node.
 
@@ -179,10 +227,15 @@ def get_views(variables, node):
   except cfg_utils.TooComplexError:
     combinations = ((var.AddBinding(node.program.default_data, [], node)
                      for var in variables),)
-  seen = []  # the accessed subsets of previously seen views
+  seen = _AccessedSubsets()  # the accessed subsets of previously seen views
+  # Note that the combinations must be checked one at a time: whether a view is
+  # skipped depends on what the caller accessed in the views before it.
   for combination in combinations:
+    # The checks below run on a plain dict, which is cheaper to build than an
+    # AccessTrackingDict. We wrap the view only once we are about to yield it,
+    # so skipped combinations never pay for the tracking.
     view = {value.variable: value for value in combination}
-    if any(subset <= view.items() for subset in seen):
+    if seen.has_subset_of(view):
       # Optimization: This view can be skipped because it matches the accessed
       # subset of a previous one.
       log.info("Skipping view (already seen): %r", view)
@@ -195,24 +248,62 @@ def get_views(variables, node):
     skip_future = yield view
     if skip_future:
       # Skip future views matching this accessed subset.
-      seen.append(view.accessed_subset.items())
+      seen.add(view.accessed_subset)
 
 
-def get_signatures(func):
-  """Gets the given function's signatures."""
+def _pytd_signatures(func):
+  return [sig.signature for sig in func.signatures]
+
+
+def _interpreter_signatures(func):
+  return [f.signature for f in func.signature_functions()]
+
+
+def _bound_signatures(func):
+  sigs = get_signatures(func.underlying)
+  return [sig.drop_first_parameter() for sig in sigs]  # drop "self"
+
+
+def _method_signatures(func):
+  return get_signatures(func.method)
+
+
+def _simple_signatures(func):
+  return [func.signature]
+
+
+def _get_signatures_function(func):
+  """Picks the get_signatures helper for values like func, or None."""
   if func.isinstance_PyTDFunction():
-    return [sig.signature for sig in func.signatures]
+    return _pytd_signatures
   elif func.isinstance_InterpreterFunction():
-    return [f.signature for f in func.signature_functions()]
+    return _interpreter_signatures
   elif func.isinstance_BoundFunction():
-    sigs = get_signatures(func.underlying)
-    return [sig.drop_first_parameter() for sig in sigs]  # drop "self"
+    return _bound_signatures
   elif func.isinstance_ClassMethod() or func.isinstance_StaticMethod():
-    return get_signatures(func.method)
+    return _method_signatures
   elif func.isinstance_SimpleFunction():
-    return [func.signature]
+    return _simple_signatures
   else:
-    raise NotImplementedError(func.__class__.__name__)
+    return None
+
+
+# The isinstance_* checks in get_signatures and is_callable depend only on the
+# class of a value, so we do them once per class and memoize the outcome.
+_signatures_functions = {}
+_callable_classes = {}
+
+
+def get_signatures(func):
+  """Gets the given function's signatures."""
+  func_cls = func.__class__
+  get = _signatures_functions.get(func_cls)
+  if get is None:
+    get = _get_signatures_function(func)
+    if get is None:
+      raise NotImplementedError(func_cls.__name__)
+    _signatures_functions[func_cls] = get
+  return get(func)
 
 
 def func_name_is_class_init(name):
@@ -236,31 +327,35 @@ def equivalent_to(binding, cls):
 
 def apply_mutations(node, get_mutations):
   """Apply mutations yielded from a get_mutations function."""
-  log.info("Applying mutations")
   num_mutations = 0
   for obj, name, value in get_mutations():
     if not num_mutations:
+      log.info("Applying mutations")
       # mutations warrant creating a new CFG node
       node = node.ConnectNew(node.name)
     num_mutations += 1
     obj.merge_instance_type_parameter(node, name, value)
-  log.info("Applied %d mutations", num_mutations)
+  # Most calls have no mutations, so we only log when there were some.
+  if num_mutations:
+    log.info("Applied %d mutations", num_mutations)
   return node
 
 
 def get_template(val):
   """Get the value's class template."""
+  # We recurse via the all_template_names property, which memoizes the result
+  # on each value, so that a class hierarchy is walked only once.
   if val.isinstance_Class():
     res = {t.full_name for t in val.template}
     if val.isinstance_ParameterizedClass():
-      res.update(get_template(val.base_cls))
+      res.update(val.base_cls.all_template_names)
     elif val.isinstance_PyTDClass() or val.isinstance_InterpreterClass():
       for base in val.bases():
         base = get_atomic_value(base, default=val.vm.convert.unsolvable)
-        res.update(get_template(base))
+        res.update(base.all_template_names)
     return res
   elif val.cls:
-    return get_template(val.cls)
+    return val.cls.all_template_names
   else:
     return set()
 
@@ -499,7 +594,13 @@ def compute_template(val):
   return template
 
 
-def _hash_dict(vardict, names):
+def _new_hash(data=b""):
+  # The digests are only used as cache keys, so we don't need a cryptographic
+  # hash. blake2b is considerably faster than md5 on 64-bit platforms.
+  return hashlib.blake2b(data, digest_size=16)
+
+
+def _hash_dict(vardict, names, var_hashes):
   """Hash a dictionary.
 
   This contains the keys and the full hashes of the data in the values.
@@ -508,23 +609,43 @@ def _hash_dict(vardict, names):
     vardict: A dictionary mapping str to Variable.
     names: If this is non-None, the snapshot will include only those
       dictionary entries whose keys appear in names.
+    var_hashes: A dictionary mapping each Variable to the full hashes of its
+      data. Used as a cache, since the same Variable is often reachable under
+      several names or from several dictionaries.
 
   Returns:
     A hash of the dictionary.
   """
-  if names is not None:
-    vardict = {name: vardict[name] for name in names.intersection(vardict)}
-  m = hashlib.md5()
-  for name, var in sorted(vardict.items()):
-    m.update(compat.bytestring(name))
-    for value in var.bindings:
-      m.update(value.data.get_fullhash())
-  return m.digest()
+  if names is None:
+    keys = vardict
+  elif len(names) < len(vardict):
+    # Usually only a few of the names are requested, so we look them up
+    # directly instead of building a filtered copy of vardict.
+    keys = names
+  else:
+    keys = names.intersection(vardict)
+  # Collect everything first so that the bytes are hashed in a single call.
+  parts = []
+  for name in sorted(keys):
+    var = vardict.get(name)
+    if var is None:
+      continue
+    var_hash = var_hashes.get(var)
+    if var_hash is None:
+      var_hash = var_hashes[var] = b"".join(
+          value.data.get_fullhash() for value in var.bindings)
+    parts.append(compat.bytestring(name))
+    parts.append(var_hash)
+  return _new_hash(b"".join(parts)).digest()
 
 
 def hash_all_dicts(*hash_args):
   """Convenience method for hashing a sequence of dicts."""
-  return hashlib.md5(b"".join(_hash_dict(*args) for args in hash_args)).digest()
+  # The data can't change while we're hashing, so it's safe to share the cache
+  # of variable hashes across all of the dicts.
+  var_hashes = {}
+  return _new_hash(b"".join(_hash_dict(vardict, names, var_hashes)
+                            for vardict, names in hash_args)).digest()
 
 
 def _matches_generator(type_obj, allowed_types):
@@ -541,14 +662,17 @@ def _matches_generator(type_obj, allowed_types):
             base_cls.isinstance_AMBIGUOUS_OR_EMPTY())
 
 
+_GENERATOR_NAMES = frozenset(("generator", "Iterable", "Iterator"))
+_ASYNC_GENERATOR_NAMES = frozenset(
+    ("asyncgenerator", "AsyncIterable", "AsyncIterator"))
+
+
 def matches_generator(type_obj):
-  allowed_types = ("generator", "Iterable", "Iterator")
-  return _matches_generator(type_obj, allowed_types)
+  return _matches_generator(type_obj, _GENERATOR_NAMES)
 
 
 def matches_async_generator(type_obj):
-  allowed_types = ("asyncgenerator", "AsyncIterable", "AsyncIterator")
-  return _matches_generator(type_obj, allowed_types)
+  return _matches_generator(type_obj, _ASYNC_GENERATOR_NAMES)
 
 
 def var_map(func, var):
@@ -636,9 +760,9 @@ def get_annotations_dict(members):
   Returns:
     members['__annotations__'] unpacked as a python dict, or None
   """
-  if "__annotations__" not in members:
+  annots_var = members.get("__annotations__")
+  if annots_var is None:
     return None
-  annots_var = members["__annotations__"]
   try:
     annots = get_atomic_value(annots_var)
   except ConversionError:
@@ -747,8 +871,13 @@ def merged_type_parameter(node, var, param):
     return node.program.NewVariable()
   if is_var_splat(var):
     var = unwrap_splat(var)
-  params = [v.get_instance_type_parameter(param) for v in var.data]
-  return var.data[0].vm.join_variables(node, params)
+  # Values often share a type parameter variable (e.g., several bindings of the
+  # same instance), so we paste each distinct variable only once.
+  params = {}
+  for v in var.data:
+    p = v.get_instance_type_parameter(param)
+    params.setdefault(id(p), p)
+  return var.data[0].vm.join_variables(node, list(params.values()))
 
 
 def is_var_splat(var):
@@ -766,12 +895,17 @@ def unwrap_splat(var):
 
 def is_callable(value: _BaseValue):
   """Returns whether 'value' is a callable."""
-  if (value.isinstance_Function() or
-      value.isinstance_BoundFunction() or
-      value.isinstance_ClassMethod() or
-      value.isinstance_ClassMethodInstance() or
-      value.isinstance_StaticMethod() or
-      value.isinstance_StaticMethodInstance()):
+  value_cls = value.__class__
+  callable_class = _callable_classes.get(value_cls)
+  if callable_class is None:
+    callable_class = _callable_classes[value_cls] = (
+        value.isinstance_Function() or
+        value.isinstance_BoundFunction() or
+        value.isinstance_ClassMethod() or
+        value.isinstance_ClassMethodInstance() or
+        value.isinstance_StaticMethod() or
+        value.isinstance_StaticMethodInstance())
+  if callable_class:
     return True
   if not value.cls or not value.cls.isinstance_Class():
     return False
@@ -781,13 +915,20 @@ def is_callable(value: _BaseValue):
 
 
 def expand_type_parameter_instances(bindings: Iterable[cfg.Binding]):
-  bindings = list(bindings)
-  while bindings:
-    b = bindings.pop(0)
+  """Replaces type parameter instances with the bindings of their values."""
+  # We pop from the end of the stack, so bindings are pushed in reverse order.
+  stack = list(bindings)[::-1]
+  seen = set()  # the (instance, name) pairs that have already been expanded
+  while stack:
+    b = stack.pop()
     if b.data.isinstance_TypeParameterInstance():
+      key = (id(b.data.instance), b.data.name)
+      if key in seen:
+        continue
       param_value = b.data.instance.get_instance_type_parameter(b.data.name)
       if param_value.bindings:
-        bindings = param_value.bindings + bindings
+        seen.add(key)
+        stack.extend(reversed(param_value.bindings))
         continue
     yield b
 
@@ -833,13 +974,38 @@ def is_generic_protocol(val: _BaseValue) -> bool:
           val.full_name == "typing.Protocol")
 
 
+def _merge_substs(sub1, sub2):
+  """Merges two substitutions, with sub2 taking precedence.
+
+  If the merge would not change one of the inputs, that input is returned
+  as is rather than copied, so the result may alias sub1 or sub2 (and keep
+  its dict subclass). Callers must treat the result as read-only.
+
+  Args:
+    sub1: A substitution, mapping type parameter names to variables.
+    sub2: A substitution, mapping type parameter names to variables.
+
+  Returns:
+    The merged substitution.
+  """
+  if not sub2:
+    return sub1
+  if not sub1:
+    return sub2
+  if len(sub2) <= len(sub1) and all(
+      sub1.get(k, None) is v for k, v in sub2.items()):
+    return sub1
+  return {**sub1, **sub2}
+
+
 def combine_substs(
     substs1: Optional[Collection[Dict[str, cfg.Variable]]],
     substs2: Optional[Collection[Dict[str, cfg.Variable]]]
 ) -> Collection[Dict[str, cfg.Variable]]:
   """Combines the two collections of type parameter substitutions."""
   if substs1 and substs2:
-    return tuple({**sub1, **sub2} for sub1 in substs1 for sub2 in substs2)  # pylint: disable=g-complex-comprehension
+    return tuple(_merge_substs(sub1, sub2)
+                 for sub1 in substs1 for sub2 in substs2)  # pylint: disable=g-complex-comprehension
   elif substs1:
     return substs1
   elif substs2:
@@ -1,9 +1,11 @@
 """Tests for abstract_utils.py."""
 
+from pytype import abstract
 from pytype import abstract_utils
 from pytype import config
 from pytype import errors
 from pytype import load_pytd
+from pytype import utils
 from pytype import vm
 from pytype.tests import test_base
 
@@ -12,7 +14,7 @@ import six
 import unittest
 
 
-class GetViewsTest(test_base.UnitTest):
+class AbstractUtilsTestBase(test_base.UnitTest):
 
   def setUp(self):
     super().setUp()
@@ -21,6 +23,9 @@ class GetViewsTest(test_base.UnitTest):
             python_version=self.python_version),
         load_pytd.Loader(None, self.python_version))
 
+
+class GetViewsTest(AbstractUtilsTestBase):
+
   def test_basic(self):
     v1 = self._vm.program.NewVariable([self._vm.convert.unsolvable], [],
                                       self._vm.root_node)
@@ -62,6 +67,141 @@ class GetViewsTest(test_base.UnitTest):
   def test_no_skip(self):
     self._test_optimized(skip_future_value=False, expected_num_views=2)
 
+  def test_skip_multiple_variables(self):
+    v1 = self._vm.program.NewVariable([self._vm.convert.unsolvable], [],
+                                      self._vm.root_node)
+    v2 = self._vm.program.NewVariable(
+        [self._vm.convert.int_type, self._vm.convert.str_type], [],
+        self._vm.root_node)
+    v3 = self._vm.program.NewVariable(
+        [self._vm.convert.int_type, self._vm.convert.str_type], [],
+        self._vm.root_node)
+    views = abstract_utils.get_views([v1, v2, v3], self._vm.root_node)
+    skip_future = None
+    accessed = []
+    while True:
+      try:
+        view = views.send(skip_future)
+      except StopIteration:
+        break
+      # Accesses v1 and v2 only, so views differing only in v3 are skipped,
+      # but views with a different v2 binding are not.
+      accessed.append((view[v1], view[v2]))
+      skip_future = True
+    six.assertCountEqual(self, accessed,
+                         [(v1.bindings[0], v2.bindings[0]),
+                          (v1.bindings[0], v2.bindings[1])])
+
+
+class GetAtomicValueTest(AbstractUtilsTestBase):
+
+  def test_empty_variable(self):
+    var = self._vm.program.NewVariable()
+    with self.assertRaises(abstract_utils.ConversionError) as ctx:
+      abstract_utils.get_atomic_value(var)
+    self.assertEqual(str(ctx.exception),
+                     "Cannot get atomic value from empty variable.")
+
+  def test_multiple_bindings(self):
+    var = self._vm.program.NewVariable(
+        [self._vm.convert.int_type, self._vm.convert.str_type], [],
+        self._vm.root_node)
+    with self.assertRaises(abstract_utils.ConversionError) as ctx:
+      abstract_utils.get_atomic_value(var)
+    message = str(ctx.exception)
+    self.assertTrue(message.startswith(
+        "Cannot get atomic value constant from variable."), message)
+    self.assertIn(repr(self._vm.convert.int_type), message)
+    self.assertIn(repr(self._vm.convert.str_type), message)
+    self.assertEqual(utils.message(ctx.exception),
+                     "Cannot get atomic value from variable.")
+
+  def test_multiple_bindings_message_fixed_at_raise(self):
+    var = self._vm.program.NewVariable(
+        [self._vm.convert.int_type, self._vm.convert.str_type], [],
+        self._vm.root_node)
+    with self.assertRaises(abstract_utils.ConversionError) as ctx:
+      abstract_utils.get_atomic_value(var)
+    var.AddBinding(self._vm.convert.bool_type, [], self._vm.root_node)
+    self.assertNotIn(repr(self._vm.convert.bool_type), str(ctx.exception))
+
+  def test_wrong_type(self):
+    var = self._vm.convert.unsolvable.to_variable(self._vm.root_node)
+    with self.assertRaises(abstract_utils.ConversionError) as ctx:
+      abstract_utils.get_atomic_value(var, abstract.Instance)
+    self.assertTrue(str(ctx.exception).startswith(
+        "Cannot get atomic value Instance from variable."))
+
+  def test_default(self):
+    var = self._vm.program.NewVariable()
+    self.assertIsNone(abstract_utils.get_atomic_value(var, default=None))
+
+
+class ExpandTypeParameterInstancesTest(AbstractUtilsTestBase):
+
+  def _make_param_instance(self, instance):
+    param = abstract.TypeParameter(abstract_utils.T, self._vm)
+    return abstract.TypeParameterInstance(param, instance, self._vm)
+
+  def _expand(self, values):
+    var = self._vm.program.NewVariable(values, [], self._vm.root_node)
+    return [b.data for b in
+            abstract_utils.expand_type_parameter_instances(var.bindings)]
+
+  def test_no_value(self):
+    instance = abstract.Instance(self._vm.convert.list_type, self._vm)
+    param_instance = self._make_param_instance(instance)
+    self.assertEqual(self._expand([param_instance]), [param_instance])
+
+  def test_self_referential(self):
+    # The instance's type parameter contains an instance of itself, so
+    # expanding it must not loop forever.
+    instance = abstract.Instance(self._vm.convert.list_type, self._vm)
+    param_instance = self._make_param_instance(instance)
+    unsolvable = self._vm.convert.unsolvable
+    instance.merge_instance_type_parameter(
+        self._vm.root_node, abstract_utils.T,
+        self._vm.program.NewVariable(
+            [param_instance, unsolvable], [], self._vm.root_node))
+    self.assertEqual(self._expand([param_instance]), [unsolvable])
+
+  def test_expand_once(self):
+    instance = abstract.Instance(self._vm.convert.list_type, self._vm)
+    unsolvable = self._vm.convert.unsolvable
+    instance.merge_instance_type_parameter(
+        self._vm.root_node, abstract_utils.T,
+        unsolvable.to_variable(self._vm.root_node))
+    values = [self._make_param_instance(instance),
+              self._make_param_instance(instance)]
+    self.assertEqual(self._expand(values), [unsolvable])
+
+
+class CombineSubstsTest(test_base.UnitTest):
+
+  def test_merge(self):
+    x, y = object(), object()
+    substs = abstract_utils.combine_substs(({"T": x},), ({"U": y},))
+    self.assertEqual(substs, ({"T": x, "U": y},))
+
+  def test_precedence(self):
+    x, y = object(), object()
+    substs = abstract_utils.combine_substs(({"T": x},), ({"T": y},))
+    self.assertEqual(substs, ({"T": y},))
+
+  def test_reuse_unchanged(self):
+    x, y = object(), object()
+    sub1 = {"T": x, "U": y}
+    substs = abstract_utils.combine_substs((sub1,), ({"T": x}, {}))
+    self.assertEqual(len(substs), 2)
+    self.assertIs(substs[0], sub1)
+    self.assertIs(substs[1], sub1)
+
+  def test_reuse_second(self):
+    x = object()
+    sub2 = {"T": x}
+    substs = abstract_utils.combine_substs(({},), (sub2,))
+    self.assertIs(substs[0], sub2)
+
 
 if __name__ == "__main__":
   unittest.main()
@@ -22,13 +22,15 @@ log = logging.getLogger(__name__)
 # decorator for a similar purpose, but we never actually read that attribute. We
 # should just use the decorator name as a key and eliminate one level of
 # indirection.
+_DATACLASS_METADATA_KEY = "__dataclass_fields__"
+_ATTRS_METADATA_KEY = "__attrs_attrs__"
 _METADATA_KEYS = {
-    "dataclasses.dataclass": "__dataclass_fields__",
+    "dataclasses.dataclass": _DATACLASS_METADATA_KEY,
     # attr.s gets resolved to attr._make.attrs in pyi files but intercepted by
     # the attr overlay as attr.s when processing bytecode.
-    "attr.s": "__attrs_attrs__",
-    "attr.attrs": "__attrs_attrs__",
-    "attr._make.attrs": "__attrs_attrs__"
+    "attr.s": _ATTRS_METADATA_KEY,
+    "attr.attrs": _ATTRS_METADATA_KEY,
+    "attr._make.attrs": _ATTRS_METADATA_KEY
 }
 
 
@@ -36,12 +38,15 @@ def get_metadata_key(decorator):
   return _METADATA_KEYS.get(decorator)
 
 
-class AttributeKinds:
-  CLASSVAR = "classvar"
-  INITVAR = "initvar"
+# Kinds of Attribute (see Attribute.kind).
+CLASSVAR = "classvar"
+INITVAR = "initvar"
 
 
-@attr.s(auto_attribs=True)
+_TEST_CASE_NAMES = frozenset(("unittest.TestCase", "unittest.case.TestCase"))
+
+
+@attr.s(auto_attribs=True, slots=True)
 class Attribute:
   """Represents a class member variable.
 
@@ -51,7 +56,7 @@ class Attribute:
     init: Whether the field should be included in the generated __init__
     kw_only: Whether the field is kw_only in the generated __init__
     default: Default value
-    kind: Kind of attribute (see the AttributeKinds enum)
+    kind: Kind of attribute (CLASSVAR or INITVAR), or "" for a plain field
 
   Used in metadata (see Class.metadata below).
   """
@@ -105,6 +110,9 @@ class Class(metaclass=mixin.MixinMeta):
 
   def init_mixin(self, metaclass):
     """Mix-in equivalent of __init__."""
+    # The MRO that this class's summaries (inherited metaclass, abstract
+    # methods) were computed from; see _get_single_inheritance_parent.
+    self._summary_mro = None
     if metaclass is None:
       self.cls = self._get_inherited_metaclass()
     else:
@@ -113,11 +121,15 @@ class Class(metaclass=mixin.MixinMeta):
       self.cls = metaclass
     # Key-value store of metadata for overlays to use.
     self.metadata = {}
+    # Memoized value of has_protocol_parent().
+    self._has_protocol_parent = None
     self._instance_cache = {}
     self._init_abstract_methods()
     self._init_protocol_attributes()
     self._init_overrides_bool()
-    self._all_formal_type_parameters = datatypes.AliasingMonitorDict()
+    self._summary_mro = self.mro
+    # Created on first load; most classes never need it.
+    self._all_formal_type_parameters = None
     self._all_formal_type_parameters_loaded = False
     # Call these methods in addition to __init__ when constructing instances.
     self.additional_init_methods = []
@@ -136,11 +148,12 @@ class Class(metaclass=mixin.MixinMeta):
     """Load _all_formal_type_parameters."""
     if self._all_formal_type_parameters_loaded:
       return
+    if self._all_formal_type_parameters is None:
+      self._all_formal_type_parameters = datatypes.AliasingMonitorDict()
 
-    bases = [
-        abstract_utils.get_atomic_value(
-            base, default=self.vm.convert.unsolvable) for base in self.bases()]
-    for base in bases:
+    for base in self.bases():
+      base = abstract_utils.get_atomic_value(
+          base, default=self.vm.convert.unsolvable)
       abstract_utils.parse_formal_type_parameters(
           base, self.full_name, self._all_formal_type_parameters)
 
@@ -152,17 +165,48 @@ class Class(metaclass=mixin.MixinMeta):
 
   def has_protocol_parent(self):
     """Whether this class inherits directly from typing.Protocol."""
-    if self.isinstance_PyTDClass():
-      for parent in self.pytd_cls.parents:
-        if parent.name == "typing.Protocol":
-          return True
-    elif self.isinstance_InterpreterClass():
-      for parent_var in self._bases:
-        for parent in parent_var.data:
-          if (parent.isinstance_PyTDClass() and
-              parent.full_name == "typing.Protocol"):
-            return True
-    return False
+    if self._has_protocol_parent is None:
+      if self.isinstance_PyTDClass():
+        self._has_protocol_parent = any(
+            parent.name == "typing.Protocol"
+            for parent in self.pytd_cls.parents)
+      elif self.isinstance_InterpreterClass():
+        self._has_protocol_parent = any(
+            parent.isinstance_PyTDClass() and
+            parent.full_name == "typing.Protocol"
+            for parent_var in self._bases for parent in parent_var.data)
+      else:
+        self._has_protocol_parent = False
+    return self._has_protocol_parent
+
+  def _get_single_inheritance_parent(self):
+    """Gets the parent whose MRO is the rest of this class's MRO, if any.
+
+    The class summaries computed in init_mixin (abstract methods, inherited
+    metaclass) are the result of a walk over the MRO. When the rest of the MRO
+    is exactly the parent's, as it is under single inheritance, they can be
+    derived from the parent's summaries instead of rewalking it. That is only
+    valid while the parent's MRO is still the one its summaries were computed
+    from: overlays such as chex's may reassign it later.
+
+    Returns:
+      The parent class, or None.
+    """
+    self_mro = self.mro
+    if len(self_mro) < 2 or not isinstance(self_mro[1], Class):
+      return None
+    parent = self_mro[1]
+    # The parent may not have finished init_mixin yet.
+    if getattr(parent, "_summary_mro", None) is not parent.mro:
+      return None
+    # Compare by identity: ParameterizedClass.__eq__ reads the formal type
+    # parameters, which recurses for self-referential generics that are still
+    # being initialized.
+    parent_mro = parent.mro
+    if (len(parent_mro) == len(self_mro) - 1 and
+        all(a is b for a, b in zip(parent_mro, self_mro[1:]))):
+      return parent
+    return None
 
   def _init_protocol_attributes(self):
     """Compute this class's protocol attributes."""
@@ -189,8 +233,9 @@ class Class(metaclass=mixin.MixinMeta):
       if cls.is_protocol:
         # Add protocol attributes defined by this class.
         protocol_attributes |= {a for a in cls.protocol_attributes if a in cls}
-      else:
-        # Remove attributes implemented by this class.
+      elif protocol_attributes:
+        # Remove attributes implemented by this class. Until we reach the first
+        # protocol in the MRO, there is nothing to remove.
         protocol_attributes = {a for a in protocol_attributes if a not in cls}
     self.protocol_attributes = protocol_attributes
 
@@ -202,10 +247,12 @@ class Class(metaclass=mixin.MixinMeta):
     if self.isinstance_ParameterizedClass():
       self.overrides_bool = self.base_cls.overrides_bool
       return
+    # Members can be added to a class after it is created, so we check each
+    # class's current attributes rather than reusing its overrides_bool.
     for cls in self.mro:
       if isinstance(cls, Class):
-        if any(x in cls.get_own_attributes()
-               for x in (bool_override, "__len__")):
+        own_attributes = cls.get_own_attributes()
+        if bool_override in own_attributes or "__len__" in own_attributes:
           self.overrides_bool = True
           return
     self.overrides_bool = False
@@ -220,15 +267,27 @@ class Class(metaclass=mixin.MixinMeta):
     # abstract methods defined by this class. We'll overwrite the attribute
     # with the full set of abstract methods later.
     self.abstract_methods = self.get_own_abstract_methods()
-    abstract_methods = set()
-    for cls in reversed(self.mro):
+    parent = self._get_single_inheritance_parent()
+    if parent:
+      # The parent's abstract methods have already been computed from the rest
+      # of the MRO, so we only need to apply this class.
+      abstract_methods = set(parent.abstract_methods)
+      classes = (self,)
+    else:
+      abstract_methods = set()
+      classes = reversed(self.mro)
+    for cls in classes:
       if not isinstance(cls, Class):
         continue
-      # Remove methods implemented by this class.
-      abstract_methods = {m for m in abstract_methods
-                          if m not in cls or m in cls.abstract_methods}
-      # Add abstract methods defined by this class.
-      abstract_methods |= {m for m in cls.abstract_methods if m in cls}
+      # Most classes have no abstract methods, so we check membership in cls
+      # only when there is something to check.
+      if abstract_methods:
+        # Remove methods implemented by this class.
+        abstract_methods = {m for m in abstract_methods
+                            if m not in cls or m in cls.abstract_methods}
+      if cls.abstract_methods:
+        # Add abstract methods defined by this class.
+        abstract_methods |= {m for m in cls.abstract_methods if m in cls}
     self.abstract_methods = abstract_methods
 
   def _has_explicit_abcmeta(self):
@@ -256,8 +315,7 @@ class Class(metaclass=mixin.MixinMeta):
             bool(self.abstract_methods))
 
   def _is_test_class(self):
-    return any(base.full_name in ("unittest.TestCase", "unittest.case.TestCase")
-               for base in self.mro)
+    return any(base.full_name in _TEST_CASE_NAMES for base in self.mro)
 
   @property
   def is_enum(self):
@@ -272,6 +330,11 @@ class Class(metaclass=mixin.MixinMeta):
     return bool(self.protocol_attributes)
 
   def _get_inherited_metaclass(self):
+    parent = self._get_single_inheritance_parent()
+    if parent and parent.cls is None:
+      # The parent already searched the rest of the MRO for a metaclass when
+      # it was created and found none.
+      return None
     for base in self.mro[1:]:
       if isinstance(base, Class) and base.cls is not None:
         return base.cls
@@ -350,10 +413,9 @@ class Class(metaclass=mixin.MixinMeta):
     node, method = self.vm.attribute_handler.get_attribute(
         node, value.data, method_name, value)
     if method:
-      call_repr = "%s.%s(..._)" % (self.name, method_name)
-      log.debug("calling %s", call_repr)
+      log.debug("calling %s.%s(..._)", self.name, method_name)
       node, ret = self.vm.call_function(node, method, args)
-      log.debug("%s returned %r", call_repr, ret)
+      log.debug("%s.%s(..._) returned %r", self.name, method_name, ret)
     return node
 
   def _call_init(self, node, value, args):
@@ -367,9 +429,10 @@ class Class(metaclass=mixin.MixinMeta):
     # We allow only one "instance" per code location, regardless of call stack.
     key = self.vm.frame.current_opcode
     assert key
-    if key not in self._instance_cache:
-      self._instance_cache[key] = self._to_instance(container)
-    return self._instance_cache[key]
+    instance = self._instance_cache.get(key)
+    if instance is None:
+      instance = self._instance_cache[key] = self._to_instance(container)
+    return instance
 
   def call(self, node, value, args):
     if self.is_abstract and not self.from_annotation:
@@ -412,18 +475,21 @@ class Class(metaclass=mixin.MixinMeta):
   def compute_mro(self):
     """Compute the class precedence list (mro) according to C3."""
     bases = abstract_utils.get_mro_bases(self.bases(), self.vm)
-    bases = [[self]] + [list(base.mro) for base in bases] + [list(bases)]
-    base2cls = {}
-    newbases = []
-    for row in bases:
+    # Fast path: with at most one base, C3 reduces to prepending this class.
+    if not bases:
+      return (self,)
+    if len(bases) == 1 and not bases[0].isinstance_ParameterizedClass():
+      return (self,) + tuple(bases[0].mro)
+    base2cls = {self: self}
+    newbases = [[self]]
+    # The rows are only read, so we can use the bases' MROs without copying.
+    for row in [base.mro for base in bases] + [bases]:
       baselist = []
+      append = baselist.append
       for base in row:
-        if base.isinstance_ParameterizedClass():
-          base2cls[base.base_cls] = base
-          baselist.append(base.base_cls)
-        else:
-          base2cls[base] = base
-          baselist.append(base)
+        cls = base.base_cls if base.isinstance_ParameterizedClass() else base
+        base2cls[cls] = base
+        append(cls)
       newbases.append(baselist)
 
     # calc MRO and replace them with original base classes
@@ -457,18 +523,18 @@ class Class(metaclass=mixin.MixinMeta):
   def _get_attrs_from_mro(self, cls_attrs, metadata_key):
     """Traverse the MRO and collect base class attributes for metadata_key."""
 
-    if metadata_key == "__attrs_attrs__":
+    if metadata_key == _ATTRS_METADATA_KEY:
       # attrs are special-cased
       return self._get_mro_attrs_for_attrs(cls_attrs, metadata_key)
 
     all_attrs = {}
-    sub_attrs = [base_cls.metadata.get(metadata_key, [])
-                 for base_cls in reversed(self.mro[1:])
-                 if isinstance(base_cls, Class)]
-    sub_attrs.append(cls_attrs)
-    for attrs in sub_attrs:
-      for a in attrs:
-        all_attrs[a.name] = a
+    for base_cls in reversed(self.mro[1:]):
+      if not isinstance(base_cls, Class):
+        continue
+      sub_attrs = base_cls.metadata.get(metadata_key)
+      if sub_attrs:
+        all_attrs.update((a.name, a) for a in sub_attrs)
+    all_attrs.update((a.name, a) for a in cls_attrs)
     return list(all_attrs.values())
 
   def record_attr_ordering(self, own_attrs):
@@ -486,7 +552,6 @@ class Class(metaclass=mixin.MixinMeta):
       The list of combined attrs.
     """
     # We want this to crash if 'decorator' is not in _METADATA_KEYS
-    assert decorator in _METADATA_KEYS, f"No metadata key for {decorator}"
     key = _METADATA_KEYS[decorator]
     attrs = self._get_attrs_from_mro(own_attrs, key)
     # Stash attributes in class metadata for subclasses.
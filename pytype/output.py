@@ -402,7 +402,7 @@ class Converter(utils.VirtualMachineWeakrefMixin):
     for a in attrs:
       if a.name in annotations:
         typ = annotations[a.name]
-      elif a.kind == class_mixin.AttributeKinds.INITVAR:
+      elif a.kind == class_mixin.INITVAR:
         # Do not output initvars without defaults
         typ = None
       else:
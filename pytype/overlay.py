@@ -51,8 +51,9 @@ class Overlay(abstract.Module):
 
   def items(self):
     items = super().items()
-    items += [(name, item) for name, item in self.real_module.items()
-              if name not in self._member_map]
+    member_map = self._member_map
+    items.extend((name, item) for name, item in self.real_module.items()
+                 if name not in member_map)
     return items
 
 
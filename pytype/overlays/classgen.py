@@ -4,8 +4,8 @@ Contains common functionality used by dataclasses, attrs and namedtuples.
 """
 
 import abc
-import collections
 import logging
+import types
 
 from pytype import abstract
 from pytype import abstract_utils
@@ -20,7 +20,6 @@ log = logging.getLogger(__name__)
 # type aliases for convenience
 Param = overlay_utils.Param
 Attribute = class_mixin.Attribute
-AttributeKinds = class_mixin.AttributeKinds
 
 
 class Ordering:
@@ -62,20 +61,30 @@ class Decorator(abstract.PyTDFunction, metaclass=abc.ABCMeta):
     # the right class.
     self._current_args = None
     self.args = {}  # map from each class we decorate to its args
+    # A read-only view of the defaults, shared by every class we decorate that
+    # does not override any of them.
+    self._default_args = types.MappingProxyType(self._DEFAULT_ARGS)
 
   @abc.abstractmethod
   def decorate(self, node, cls):
     """Apply the decorator to cls."""
 
   def update_kwargs(self, args):
-    self._current_args = self._DEFAULT_ARGS.copy()
+    defaults = self._DEFAULT_ARGS
+    current_args = None
     for k, v in args.namedargs.items():
-      if k in self._current_args:
+      if k in defaults:
         try:
-          self._current_args[k] = abstract_utils.get_atomic_python_constant(v)
+          value = abstract_utils.get_atomic_python_constant(v)
         except abstract_utils.ConversionError:
           self.vm.errorlog.not_supported_yet(
               self.vm.frames, "Non-constant argument to decorator: %r" % k)
+          continue
+        if current_args is None:
+          current_args = dict(defaults)
+        current_args[k] = value
+    # Only classes that override a default get their own dict of args.
+    self._current_args = current_args or self._default_args
 
   def init_name(self, attr):
     """Attribute name as an __init__ keyword, could differ from attr.name."""
@@ -85,6 +94,9 @@ class Decorator(abstract.PyTDFunction, metaclass=abc.ABCMeta):
     pos_params = []
     kwonly_params = []
     all_kwonly = self.args[cls]["kw_only"]
+    # The kw_only arg is ignored in python2; using it is not an error.
+    py3 = self.vm.PY3
+    init_name = self.init_name
     for attr in attrs:
       if not attr.init:
         continue
@@ -92,14 +104,10 @@ class Decorator(abstract.PyTDFunction, metaclass=abc.ABCMeta):
       # call self.init_name in case the name differs from the field name -
       # e.g. attrs removes leading underscores from attrib names when
       # generating kwargs for __init__.
-      param = Param(
-          name=self.init_name(attr),
-          typ=typ,
-          default=attr.default)
+      param = Param(name=init_name(attr), typ=typ, default=attr.default)
 
-      # The kw_only arg is ignored in python2; using it is not an error.
       # kw_only=False in a field does not override kw_only=True in the class.
-      if self.vm.PY3 and (all_kwonly or attr.kw_only):
+      if py3 and (all_kwonly or attr.kw_only):
         kwonly_params.append(param)
       else:
         pos_params.append(param)
@@ -110,6 +118,14 @@ class Decorator(abstract.PyTDFunction, metaclass=abc.ABCMeta):
   def call(self, node, func, args):
     """Construct a decorator, and call it on the class."""
     args = args.simplify(node, self.vm)
+    if len(args.posargs) == 1:
+      cls_var = args.posargs[0]
+      if (len(cls_var.bindings) == 1 and
+          cls_var.data[0].isinstance_AMBIGUOUS_OR_EMPTY() and
+          args.replace(posargs=()).is_empty()):
+        # We were given only an ambiguous class. There is nothing to decorate,
+        # and no argument that could fail to match, so skip the matching.
+        return node, cls_var
     self.match_args(node, args)
 
     # There are two ways to use a decorator:
@@ -144,7 +160,7 @@ class Decorator(abstract.PyTDFunction, metaclass=abc.ABCMeta):
 
     cls_var = args.posargs[0]
     # We should only have a single binding here
-    cls, = cls_var.data
+    cls = cls_var.data[0]
 
     if not isinstance(cls, class_mixin.Class):
       # There are other valid types like abstract.Unsolvable that we don't need
@@ -164,28 +180,32 @@ class FieldConstructor(abstract.PyTDFunction):
   """Implements constructors for fields."""
 
   def get_kwarg(self, args, name, default):
-    if name not in args.namedargs:
+    var = args.namedargs.get(name)
+    if var is None:
       return default
     try:
-      return abstract_utils.get_atomic_python_constant(args.namedargs[name])
+      return abstract_utils.get_atomic_python_constant(var)
     except abstract_utils.ConversionError:
       self.vm.errorlog.not_supported_yet(
           self.vm.frames, "Non-constant argument %r" % name)
 
 
+_METHOD_TYPES = abstract.INTERPRETER_FUNCTION_TYPES + (
+    special_builtins.ClassMethodInstance,
+    special_builtins.PropertyInstance,
+    special_builtins.StaticMethodInstance,
+)
+
+
 def is_method(var):
   if var is None:
     return False
-  return isinstance(var.data[0], (
-      abstract.INTERPRETER_FUNCTION_TYPES,
-      special_builtins.ClassMethodInstance,
-      special_builtins.PropertyInstance,
-      special_builtins.StaticMethodInstance
-  ))
+  return isinstance(var.data[0], _METHOD_TYPES)
 
 
 def is_dunder(name):
-  return name.startswith("__") and name.endswith("__")
+  # Comparing slices avoids two method calls per name.
+  return name[:2] == "__" and name[-2:] == "__"
 
 
 def add_member(node, cls, name, typ):
@@ -211,31 +231,38 @@ def get_class_locals(cls_name, allow_methods, ordering, vm):
     vm: The VirtualMachine.
 
   Returns:
-    A collections.OrderedDict of the locals.
+    An insertion-ordered dict of the locals.
   """
-  # TODO(rechen): Once we drop Python 2 support, either use a normal dict or
-  # replace key deletion with OrderedDict.move_to_end().
-  out = collections.OrderedDict()
-  if cls_name not in vm.local_ops:
+  out = {}
+  ops = vm.local_ops.get(cls_name)
+  if ops is None:
     # See TestAttribPy3.test_cannot_decorate in tests/py3/test_attr.py. The
     # class will not be in local_ops if a previous decorator hides it.
     return out
-  for op in vm.local_ops[cls_name]:
-    if is_dunder(op.name):
+  first_annotate = ordering is Ordering.FIRST_ANNOTATE
+  assert first_annotate or ordering is Ordering.LAST_ASSIGN
+  annotated_locals = vm.annotated_locals[cls_name]
+  for op in ops:
+    name = op.name
+    if is_dunder(name):
+      continue
+    # Filter on the op kind before looking up the local, which is the more
+    # expensive check.
+    if first_annotate:
+      # out doubles as the set of names already emitted. Names whose first
+      # annotation is a disallowed method are not recorded, so a later
+      # annotation of the same name can still be picked up.
+      if not op.is_annotate() or name in out:
+        continue
+    elif not op.is_assign():
       continue
-    local = vm.annotated_locals[cls_name][op.name]
+    local = annotated_locals[name]
     if not allow_methods and is_method(local.orig):
       continue
-    if ordering is Ordering.FIRST_ANNOTATE:
-      if not op.is_annotate() or op.name in out:
-        continue
-    else:
-      assert ordering is Ordering.LAST_ASSIGN
-      if not op.is_assign():
-        continue
-      elif op.name in out:
-        del out[op.name]
-    out[op.name] = local
+    if not first_annotate and name in out:
+      # Deleting and reinserting moves the name to the end.
+      del out[name]
+    out[name] = local
   return out
 
 
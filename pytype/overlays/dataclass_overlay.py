@@ -8,6 +8,7 @@ import logging
 
 from pytype import abstract
 from pytype import abstract_utils
+from pytype import class_mixin
 from pytype import function
 from pytype import overlay
 from pytype.overlays import classgen
@@ -78,7 +79,7 @@ class Dataclass(classgen.Decorator):
       if initvar_typ:
         typ = initvar_typ
         init = True
-        kind = classgen.AttributeKinds.INITVAR
+        kind = class_mixin.INITVAR
       else:
         if not orig:
           classgen.add_member(node, cls, name, typ)
@@ -503,6 +503,26 @@ class GenericBasicTest(test_base.TargetPython3BasicTest):
         g = a.G[int]()
       """, pythonpath=[d.path])
 
+  def test_self_type_parameter_single_inheritance_chain(self):
+    # Class summaries are reused from the parent under single inheritance;
+    # make sure detecting that does not recurse through the generic base.
+    with file_utils.Tempdir() as d:
+      d.create_file("a.pyi", """
+        from typing import Sequence
+
+        class A(Sequence[A]): ...
+        class B(A): ...
+        class C(B): ...
+        class D(C): ...
+        class E(D): ...
+      """)
+      self.Check("""
+        import a
+
+        e = a.E()
+        x = e[0]
+      """, pythonpath=[d.path])
+
   def test_any_match_all_types(self):
     _, errors = self.InferWithErrors("""
       import collections, typing